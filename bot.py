@@ -3,18 +3,26 @@
 # python-telegram-bot >= 21 (async, Application.run_polling)
 # PicklePersistence (bot_state.pickle or /data/bot_state.pickle)
 # Env vars: BOT_TOKEN, ADMIN_CHAT_ID, AFFILIATE_URL, MINIAPP_URL, ADVANTAGES_URL
-# Optional: START_IMAGE_URL, START_IMAGE_PATH, KEEPALIVE, PERSIST_PATH
+# Optional: START_IMAGE_URL, START_IMAGE_PATH, KEEPALIVE, PERSIST_PATH, TRANSCRIPT_DIR
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import html
+import json
 import logging
+import math
 import os
+import queue
+import sqlite3
 import threading
+import time
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from datetime import datetime, timezone
 from typing import Any, Final, Mapping, Optional, MutableMapping, cast
 
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, User, WebAppInfo
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message, Update, User, WebAppInfo
 from telegram.constants import ParseMode
 from telegram.ext import (
     Application,
@@ -72,6 +80,29 @@ KEY_PENDING = 'pending'          # bool
 KEY_EDIT_MODE = 'edit_mode'      # bool
 KEY_LAST_WELCOME_TS = 'last_welcome_ts'  # float seconds
 
+# Helpdesk transcript
+TRANSCRIPT_SEGMENT_BYTES: Final[int] = 4 * 1024 * 1024  # rotate segment files at ~4 MiB
+HISTORY_DEFAULT: Final[int] = 10
+HISTORY_MAX: Final[int] = 50
+
+# Funnel analytics: (key, label, parent step used for the conversion rate)
+FUNNEL_STEPS: Final[tuple[tuple[str, str, Optional[str]], ...]] = (
+    ('menu', 'Menu affiché', None),
+    ('start_flow', 'Accéder aux bonus', 'menu'),
+    ('offer_beginner', 'Offre Débutant', 'start_flow'),
+    ('offer_pro', 'Offre Aguerri', 'start_flow'),
+    ('account_yes', 'Compte Stake : oui', 'offer_pro'),
+    ('account_no', 'Compte Stake : non (lien affilié)', 'offer_pro'),
+    ('resume', 'Reprise après le lien', 'account_no'),
+    ('pseudo', 'Pseudo envoyé', 'start_flow'),
+)
+FUNNEL_INDEX: Final[dict[str, int]] = {key: i for i, (key, _, _) in enumerate(FUNNEL_STEPS)}
+FUNNEL_RING_HOURS: Final[int] = 7 * 24   # hourly buckets kept in memory
+FUNNEL_FLUSH_SECS: Final[float] = 60.0   # min delay between snapshots into bot_data
+BOT_KEY_FUNNEL = 'funnel'                # bot_data key holding the persisted snapshot
+HLL_P: Final[int] = 8                    # 256 registers per sketch (~6.5% std error)
+HLL_M: Final[int] = 1 << HLL_P
+
 # -------------------------- Utils --------------------------
 
 def is_admin_chat(update: Update) -> bool:
@@ -179,6 +210,129 @@ async def notify_admin(context: ContextTypes.DEFAULT_TYPE, user: Optional[User],
     except Exception as e:
         logging.exception('Failed to notify admin: %s', e)
 
+# -------------------------- Funnel analytics --------------------------
+# Counters live in memory in a ring of hourly buckets; each bucket keeps a hit count
+# and a HyperLogLog sketch (unique users) per funnel step. A snapshot is copied into
+# bot_data at most every FUNNEL_FLUSH_SECS so PicklePersistence saves it on its own
+# schedule. /stats only merges the ring, it never scans user_data.
+
+def hll_add(regs: bytearray, item: int) -> None:
+    x = int.from_bytes(hashlib.blake2b(str(item).encode(), digest_size=8).digest(), 'big')
+    idx = x >> (64 - HLL_P)
+    rest = x & ((1 << (64 - HLL_P)) - 1)
+    rank = (64 - HLL_P) - rest.bit_length() + 1
+    if rank > regs[idx]:
+        regs[idx] = rank
+
+def hll_count(regs: bytes) -> int:
+    m = len(regs)
+    zeros = regs.count(0)
+    if zeros == m:
+        return 0
+    est = (0.7213 / (1 + 1.079 / m)) * m * m / sum(2.0 ** -r for r in regs)
+    if est <= 2.5 * m:
+        est = m * math.log(m / zeros) if zeros else est  # small-range correction
+    return round(est)
+
+class FunnelStats:
+    def __init__(self, hours: int = FUNNEL_RING_HOURS) -> None:
+        self.hours = hours
+        self.last_flush = time.monotonic()
+        n = len(FUNNEL_STEPS)
+        self._stamp = [-1] * hours  # absolute hour held by each slot
+        self._counts = [[0] * n for _ in range(hours)]
+        self._sketch: list[list[Optional[bytearray]]] = [[None] * n for _ in range(hours)]
+
+    def hit(self, step: str, user_id: Optional[int], now: Optional[float] = None) -> None:
+        """Count a hit; user_id None counts it without touching the unique-user sketch."""
+        hour = int((now if now is not None else time.time()) // 3600)
+        i = hour % self.hours
+        if self._stamp[i] != hour:  # slot holds an expired hour: recycle it
+            self._stamp[i] = hour
+            self._counts[i] = [0] * len(FUNNEL_STEPS)
+            self._sketch[i] = [None] * len(FUNNEL_STEPS)
+        s = FUNNEL_INDEX[step]
+        self._counts[i][s] += 1
+        if user_id is None:
+            return
+        regs = self._sketch[i][s]
+        if regs is None:
+            regs = self._sketch[i][s] = bytearray(HLL_M)
+        hll_add(regs, user_id)
+
+    def totals(self, hours: int, now: Optional[float] = None) -> tuple[list[int], list[int]]:
+        """(hits, unique users) per step over the last `hours` hours."""
+        current = int((now if now is not None else time.time()) // 3600)
+        n = len(FUNNEL_STEPS)
+        counts = [0] * n
+        per_step: list[list[bytearray]] = [[] for _ in range(n)]
+        for hour in range(current - min(hours, self.hours) + 1, current + 1):
+            i = hour % self.hours
+            if self._stamp[i] != hour:
+                continue
+            slot_counts, slot_sketch = self._counts[i], self._sketch[i]
+            for s in range(n):
+                counts[s] += slot_counts[s]
+                if slot_sketch[s] is not None:
+                    per_step[s].append(slot_sketch[s])
+        # One pass per step: register-wise max across every hourly sketch at once
+        uniques = [hll_count(bytes(map(max, *regs)) if len(regs) > 1 else bytes(regs[0])) if regs else 0
+                   for regs in per_step]
+        return counts, uniques
+
+    def snapshot(self) -> dict[str, Any]:
+        # Plain types only, so the pickle does not depend on this module's classes
+        return {
+            'steps': [key for key, _, _ in FUNNEL_STEPS],
+            'stamp': list(self._stamp),
+            'counts': [list(c) for c in self._counts],
+            'sketch': [[bytes(r) if r is not None else None for r in row] for row in self._sketch],
+        }
+
+    def load(self, snap: Any) -> None:
+        if not isinstance(snap, dict) or snap.get('steps') != [key for key, _, _ in FUNNEL_STEPS]:
+            return  # missing or written for another step list: start fresh
+        if len(snap.get('stamp', ())) != self.hours:
+            return
+        self._stamp = list(snap['stamp'])
+        self._counts = [list(c) for c in snap['counts']]
+        self._sketch = [[bytearray(r) if r is not None else None for r in row] for row in snap['sketch']]
+
+_funnel = FunnelStats()
+
+def funnel_hit(context: ContextTypes.DEFAULT_TYPE, step: str, user: Optional[User]) -> None:
+    try:
+        _funnel.hit(step, user.id if user else None)
+        if time.monotonic() - _funnel.last_flush >= FUNNEL_FLUSH_SECS:
+            context.bot_data[BOT_KEY_FUNNEL] = _funnel.snapshot()
+            _funnel.last_flush = time.monotonic()
+    except Exception as e:
+        logging.warning('Funnel tracking failed: %s', e)
+
+def parse_period_hours(arg: str) -> int:
+    """'24h', '7d' or a bare number of hours. Returns 0 if invalid."""
+    arg = arg.strip().lower()
+    mult = 24 if arg.endswith('d') else 1
+    hours = _parse_int(arg.rstrip('hd')) * mult
+    return hours if hours > 0 else 0
+
+def stats_text(hours: int, counts: list[int], uniques: list[int]) -> str:
+    def rate(num: int, den: int) -> str:
+        return f'{100.0 * num / den:.1f} %' if den else 'n/d'
+
+    period = f'{hours // 24} j' if hours % 24 == 0 else f'{hours} h'
+    lines = [f'📊 <b>Funnel</b> — période : {period}', '<i>Étape : clics (utilisateurs uniques) — conversion</i>']
+    for i, (_, label, parent) in enumerate(FUNNEL_STEPS):
+        line = f'• {label} : <b>{counts[i]}</b> ({uniques[i]})'
+        if parent:
+            line += f' — {rate(uniques[i], uniques[FUNNEL_INDEX[parent]])}'
+        lines.append(line)
+    no, resumed = uniques[FUNNEL_INDEX['account_no']], uniques[FUNNEL_INDEX['resume']]
+    lines.append('')
+    lines.append(f'• Abandon au lien affilié : <b>{rate(max(no - resumed, 0), no)}</b>')
+    lines.append(f'• Conversion globale menu → pseudo : <b>{rate(uniques[FUNNEL_INDEX["pseudo"]], uniques[FUNNEL_INDEX["menu"]])}</b>')
+    return '\n'.join(lines)
+
 # -------------------------- Images / UI helpers --------------------------
 
 async def send_start_image(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -201,6 +355,7 @@ async def send_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     chat_id = update.effective_chat.id if update.effective_chat else None
     if not chat_id:
         return
+    funnel_hit(context, 'menu', update.effective_user)
     try:
         if START_IMAGE_PATH and os.path.isfile(START_IMAGE_PATH):
             with open(START_IMAGE_PATH, 'rb') as f:
@@ -287,16 +442,16 @@ async def start_flow_from_menu(update: Update, context: ContextTypes.DEFAULT_TYP
 
     # Anti-spam: avoid sending multiple welcome messages if user taps rapidly
     try:
-        import time as _t
         ud = udict(context)
         last = float(ud.get(KEY_LAST_WELCOME_TS, 0))
-        now = _t.time()
+        now = time.time()
         if now - last < 8:
             return CHOOSING_OFFER
         ud[KEY_LAST_WELCOME_TS] = now
     except Exception:
         pass
 
+    funnel_hit(context, 'start_flow', update.effective_user)
     name = update.effective_user.first_name if update.effective_user else 'là'
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
@@ -322,6 +477,7 @@ async def choose_offer_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     if data == CB_BEGINNER:
         ud[KEY_OFFER] = 'beginner'
+        funnel_hit(context, 'offer_beginner', update.effective_user)
         await q.edit_message_text(
             BEGINNER_TEXT, parse_mode=ParseMode.HTML, disable_web_page_preview=True
         )
@@ -329,6 +485,7 @@ async def choose_offer_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     if data == CB_PRO:
         ud[KEY_OFFER] = 'pro'
+        funnel_hit(context, 'offer_pro', update.effective_user)
         await q.edit_message_text(
             PRO_ASK_ACCOUNT,
             parse_mode=ParseMode.HTML,
@@ -349,6 +506,7 @@ async def has_account_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await q.answer()
 
     if q.data == CB_HAS_ACCOUNT_YES:
+        funnel_hit(context, 'account_yes', update.effective_user)
         await q.edit_message_text(
             'Parfait ! Quel est ton <b>pseudo Stake</b> ? 😎',
             parse_mode=ParseMode.HTML,
@@ -356,6 +514,7 @@ async def has_account_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return ASK_PSEUDO
 
     if q.data == CB_HAS_ACCOUNT_NO:
+        funnel_hit(context, 'account_no', update.effective_user)
         text = AFFILIATE_MESSAGE.format(url=(AFFILIATE_URL or 'https://stake.bet/?c=b7de45ae56'))
         await q.edit_message_text(
             text,
@@ -366,6 +525,7 @@ async def has_account_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return ASK_HAS_ACCOUNT
 
     if q.data == CB_RESUME_FLOW:
+        funnel_hit(context, 'resume', update.effective_user)
         await q.edit_message_text(
             PRO_ASK_ACCOUNT,
             parse_mode=ParseMode.HTML,
@@ -397,6 +557,8 @@ async def capture_pseudo(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     ud[KEY_DATE] = now_utc_iso()
     ud[KEY_PENDING] = True
     ud.pop(KEY_EDIT_MODE, None)  # clear edit mode if present
+    if not is_edit:
+        funnel_hit(context, 'pseudo', update.effective_user)
 
     # Notify admin of (new or updated) submission
     await notify_admin(context, update.effective_user, update.effective_chat.id if update.effective_chat else 0)
@@ -424,6 +586,194 @@ async def edit_info_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     await q.edit_message_text(EDIT_REMINDER, parse_mode=ParseMode.HTML)
     return ASK_PSEUDO
 
+# -------------------------- Helpdesk transcript --------------------------
+# Append-only log of every mirrored message (user → admin and admin → user).
+# Records are JSON lines written to size-rotated segment files; a SQLite index maps
+# each user to (segment, offset, length) so /history seeks instead of scanning.
+# Writes are queued and performed by a background thread, off the event loop.
+
+class TranscriptLog:
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Items: a record dict, an Event (flush marker set once written) or None (stop)
+        self._queue: queue.SimpleQueue[dict[str, Any] | threading.Event | None] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, '
+            'segment INTEGER NOT NULL, pos INTEGER NOT NULL, length INTEGER NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_by_user ON entries (user_id, id)')
+        self._db.commit()
+        segments = sorted(
+            int(name[len('segment-'):-len('.log')])
+            for name in os.listdir(directory)
+            if name.startswith('segment-') and name.endswith('.log')
+        )
+        self._segment = segments[-1] if segments else 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+        self._thread = threading.Thread(target=self._run, name='transcript-writer', daemon=True)
+        self._thread.start()
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f'segment-{segment:06d}.log')
+
+    def append(self, record: dict[str, Any]) -> None:
+        """Queue a record; never blocks the caller on disk I/O."""
+        self._queue.put(record)
+
+    def _run(self) -> None:
+        # Sole consumer of the queue, so records hit the log in the order they were queued
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in batch if isinstance(item, dict)]
+            if records:
+                with self._lock:
+                    try:
+                        self._write_locked(records)
+                    except Exception as e:
+                        logging.exception('Transcript write failed, %d record(s) dropped: %s', len(records), e)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if any(item is None for item in batch):
+                return
+
+    def _write_locked(self, records: list[dict[str, Any]]) -> None:
+        """Append records and index them in one batch; on failure, undo the whole batch."""
+        if self._file.closed:  # a previous rollback could not reopen the segment
+            self._file = open(self._segment_path(self._segment), 'ab')
+        start_segment, start_pos = self._segment, self._file.tell()
+        rows = []
+        try:
+            for rec in records:
+                try:
+                    user_id = int(rec['user_id'])
+                    data = json.dumps(rec, ensure_ascii=False).encode('utf-8') + b'\n'
+                except Exception as e:
+                    logging.warning('Skipping malformed transcript record: %s', e)
+                    continue
+                pos = self._file.tell()
+                if pos and pos + len(data) > TRANSCRIPT_SEGMENT_BYTES:
+                    self._file.close()
+                    self._segment += 1
+                    self._file = open(self._segment_path(self._segment), 'ab')
+                    pos = 0
+                self._file.write(data)
+                rows.append((user_id, self._segment, pos, len(data)))
+            if rows:
+                # Data first, index second: a crash can orphan log bytes but never index garbage
+                self._file.flush()
+                self._db.executemany('INSERT INTO entries (user_id, segment, pos, length) VALUES (?, ?, ?, ?)', rows)
+                self._db.commit()
+        except Exception:
+            self._rollback_locked(start_segment, start_pos)
+            raise
+
+    def _rollback_locked(self, segment: int, pos: int) -> None:
+        """Drop the bytes of a failed batch, including any segment opened for it."""
+        try:
+            self._db.rollback()
+        except Exception:
+            pass
+        try:
+            self._file.close()
+        except Exception:
+            pass
+        for extra in range(segment + 1, self._segment + 1):
+            try:
+                os.remove(self._segment_path(extra))
+            except OSError:
+                pass
+        self._segment = segment
+        try:
+            os.truncate(self._segment_path(segment), pos)
+        except OSError as e:
+            logging.warning('Failed to truncate transcript segment %d: %s', segment, e)
+        self._file = open(self._segment_path(segment), 'ab')
+
+    def tail(self, user_id: int, n: int) -> list[dict[str, Any]]:
+        """Return the last n records for user_id, oldest first. Blocking: run in a thread."""
+        # Wait for the writer to catch up with everything queued before this call
+        flushed = threading.Event()
+        self._queue.put(flushed)
+        flushed.wait(timeout=5)
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT segment, pos, length FROM entries WHERE user_id = ? ORDER BY id DESC LIMIT ?',
+                (user_id, n),
+            ).fetchall()
+        entries: list[dict[str, Any]] = []
+        files: dict[int, Any] = {}
+        try:
+            for segment, pos, length in reversed(rows):
+                f = files.get(segment)
+                if f is None:
+                    f = files[segment] = open(self._segment_path(segment), 'rb')
+                f.seek(pos)
+                entries.append(json.loads(f.read(length)))
+        finally:
+            for f in files.values():
+                f.close()
+        return entries
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        if self._thread.is_alive():
+            # Writer is stuck mid-batch (e.g. slow volume): leave its handles open
+            logging.warning('Transcript writer still busy after 10 s; skipping close')
+            return
+        with self._lock:
+            self._file.close()
+            self._db.close()
+
+_transcripts: Optional[TranscriptLog] = None
+
+def message_kind(msg: Message) -> str:
+    for kind in ('photo', 'video', 'animation', 'document', 'audio', 'voice', 'video_note', 'sticker', 'location', 'contact'):
+        if getattr(msg, kind, None):
+            return kind
+    return 'text' if msg.text else 'other'
+
+def record_transcript(direction: str, user_id: int, msg: Optional[Message], text: Optional[str] = None) -> None:
+    """Log a mirrored message. direction: 'in' (user → admin) or 'out' (admin → user)."""
+    if _transcripts is None:
+        return
+    sender = msg.from_user if msg else None
+    _transcripts.append({
+        'ts': now_utc_iso(),
+        'dir': direction,
+        'user_id': user_id,
+        'from': sender.first_name if sender else '',
+        'kind': message_kind(msg) if msg else 'text',
+        'text': text if text is not None else ((msg.text or msg.caption or '') if msg else ''),
+    })
+
+def history_text(user_id: int, entries: list[Mapping[str, Any]]) -> str:
+    if not entries:
+        return f'Aucun historique pour <code>{user_id}</code>.'
+    lines = [f'🗂️ <b>Historique</b> de <code>{user_id}</code> ({len(entries)} derniers messages)']
+    for e in entries:
+        arrow = '📥' if e.get('dir') == 'in' else '📤'
+        body = str(e.get('text') or '')
+        if len(body) > 300:
+            body = body[:300] + '…'
+        kind = e.get('kind', 'text')
+        prefix = f'[{kind}] ' if kind != 'text' else ''
+        lines.append(
+            f'{arrow} <i>{html.escape(str(e.get("ts", "")))}</i> — <b>{html.escape(str(e.get("from") or "?"))}</b> : '
+            f'{html.escape(prefix + body)}'
+        )
+    return '\n'.join(lines)
+
 # -------------------------- Helpdesk (Admin ⇄ User) --------------------------
 
 async def handle_user_inbox(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -449,6 +799,7 @@ async def handle_user_inbox(update: Update, context: ContextTypes.DEFAULT_TYPE)
             message_id=msg.message_id,
             protect_content=True,
         )
+        record_transcript('in', user.id, msg)
         # Send a control card with reply button
         kb = InlineKeyboardMarkup([[InlineKeyboardButton('🗨️ Répondre', callback_data=f'{CB_REPLY_PREFIX}{user.id}')]])
         info = (
@@ -526,6 +877,7 @@ async def admin_outbound_handler(update: Update, context: ContextTypes.DEFAULT_T
         text = parts[2]
         try:
             await context.bot.send_message(chat_id=uid, text=text, protect_content=True)
+            record_transcript('out', uid, msg, text=text)
             await msg.reply_text(f'✅ Message envoyé à {uid}.')
         except Exception as e:
             await msg.reply_text(f'❌ Échec de l’envoi: {e}')
@@ -550,6 +902,7 @@ async def admin_outbound_handler(update: Update, context: ContextTypes.DEFAULT_T
             message_id=msg.message_id,
             protect_content=True,
         )
+        record_transcript('out', int(target_id), msg)
         await msg.reply_text(f'✅ Message transmis à <code>{target_id}</code>.', parse_mode=ParseMode.HTML)
     except Exception as e:
         await msg.reply_text(f'❌ Échec de la transmission: {e}')
@@ -571,6 +924,56 @@ async def end_reply_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
             pass
     return ConversationHandler.END
 
+async def history_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/history <user_id> [n] — last n transcript entries for a user (admin only)."""
+    if not is_admin_chat(update):
+        return
+    msg = update.effective_message
+    if not msg:
+        return
+    args = context.args or []
+    try:
+        uid = int(args[0])
+        n = int(args[1]) if len(args) > 1 else HISTORY_DEFAULT
+    except Exception:
+        await msg.reply_text('Usage: /history <user_id> [n]')
+        return
+    n = max(1, min(n, HISTORY_MAX))
+    if _transcripts is None:
+        await msg.reply_text('Historique indisponible.')
+        return
+    try:
+        entries = await asyncio.to_thread(_transcripts.tail, uid, n)
+    except Exception as e:
+        logging.exception('Failed to read transcript: %s', e)
+        await msg.reply_text(f'❌ Lecture de l’historique impossible: {e}')
+        return
+    # Split on line boundaries to stay under Telegram's 4096-char message limit
+    chunk = ''
+    for line in history_text(uid, entries).split('\n'):
+        if chunk and len(chunk) + len(line) + 1 > 4000:
+            await msg.reply_text(chunk, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+            chunk = ''
+        chunk = f'{chunk}\n{line}' if chunk else line
+    if chunk:
+        await msg.reply_text(chunk, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+
+async def stats_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/stats [period] — funnel conversion over e.g. 24h (default), 6h, 7d (admin only)."""
+    if not is_admin_chat(update):
+        return
+    msg = update.effective_message
+    if not msg:
+        return
+    args = context.args or []
+    hours = parse_period_hours(args[0]) if args else 24
+    if not hours:
+        await msg.reply_text('Usage: /stats [période] — ex: 6h, 24h, 7d')
+        return
+    hours = min(hours, FUNNEL_RING_HOURS)
+    counts, uniques = _funnel.totals(hours)
+    await msg.reply_text(stats_text(hours, counts, uniques), parse_mode=ParseMode.HTML)
+
 # -------------------------- Other Commands --------------------------
 
 async def info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -611,17 +1014,38 @@ def start_keepalive_if_needed() -> None:
 
 # -------------------------- Application --------------------------
 
+async def _post_init(app: Application) -> None:
+    _funnel.load(app.bot_data.get(BOT_KEY_FUNNEL))
+
+async def _post_stop(app: Application) -> None:
+    # Final funnel snapshot; shutdown() persists bot_data and flushes it to disk afterwards
+    app.bot_data[BOT_KEY_FUNNEL] = _funnel.snapshot()
+
+async def _post_shutdown(app: Application) -> None:
+    if _transcripts is not None:
+        await asyncio.to_thread(_transcripts.close)
+
 def build_application() -> Application:
+    global _transcripts
     # Robust persistence path selection
     persist_path = os.environ.get('PERSIST_PATH') or (
         '/data/bot_state.pickle' if os.path.isdir('/data') else 'bot_state.pickle'
     )
     persistence = PicklePersistence(filepath=persist_path)
 
+    # Helpdesk transcript lives next to the pickle on the /data volume
+    transcript_dir = os.environ.get('TRANSCRIPT_DIR') or (
+        '/data/transcripts' if os.path.isdir('/data') else 'transcripts'
+    )
+    _transcripts = TranscriptLog(transcript_dir)
+
     app = (
         Application.builder()
         .token(BOT_TOKEN)
         .persistence(persistence)
+        .post_init(_post_init)
+        .post_stop(_post_stop)
+        .post_shutdown(_post_shutdown)
         .build()
     )
 
@@ -674,6 +1098,8 @@ def build_application() -> Application:
     # Global handlers so buttons work even outside conversation
     app.add_handler(CommandHandler('menu', menu))
     app.add_handler(CommandHandler('info', info))
+    app.add_handler(CommandHandler('history', history_cmd))
+    app.add_handler(CommandHandler('stats', stats_cmd))
     app.add_handler(CommandHandler('cancel', cancel))
     app.add_handler(CallbackQueryHandler(start_flow_from_menu, pattern=f'^{CB_START_FLOW}$'))
     app.add_handler(CallbackQueryHandler(open_menu_cb, pattern=f'^{CB_BACK_MENU}$'))